@@ -6,9 +6,16 @@ Fixtures are reusable test components that can be shared across multiple test fi
 
 import pytest
 import os
-import tempfile
-from app import app, db
-from models import User, Transaction, PriceAlert
+import sqlite3
+from array import array
+from datetime import datetime
+from sqlalchemy import create_engine
+
+# Must be set before the app module builds its app (TestingConfig: in-memory SQLite)
+os.environ['FLASK_ENV'] = 'testing'
+
+from app_enhanced import app
+from models import db, User, Transaction
 from werkzeug.security import generate_password_hash
 
 
@@ -19,13 +26,10 @@ def test_app():
     - Sets up test database (SQLite in memory)
     - Configures testing environment
     - Returns Flask app instance for testing
+    - Note: sample_transactions replaces the database contents with its template
     """
-    # Create temporary database file
-    db_fd, db_path = tempfile.mkstemp()
-    
     # Configure app for testing
     app.config['TESTING'] = True
-    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
     app.config['JWT_SECRET_KEY'] = 'test-secret-key'
     app.config['SECRET_KEY'] = 'test-secret-key'
     app.config['WTF_CSRF_ENABLED'] = False  # Disable CSRF for testing
@@ -49,10 +53,6 @@ def test_app():
         # Cleanup after test
         db.session.remove()
         db.drop_all()
-    
-    # Close and remove temporary database
-    os.close(db_fd)
-    os.unlink(db_path)
 
 
 @pytest.fixture
@@ -118,48 +118,123 @@ def auth_headers(test_client, test_app):
         return {}
 
 
+@pytest.fixture(scope='session')
+def sample_transactions_template(tmp_path_factory):
+    """
+    FIXTURE: Builds the sample transactions database once per test session
+    - Creates test user and sample transactions in a template SQLite file
+    - Returns (template path, list of transaction IDs)
+    - Tests get their own copy, so the template itself is never written to
+    """
+    template_path = tmp_path_factory.mktemp("db") / "tpl.sqlite"
+    
+    # Own engine so the app config and db.session are never touched
+    engine = create_engine(f'sqlite:///{template_path}')
+    users = User.__table__
+    transactions = Transaction.__table__
+    
+    try:
+        db.metadata.create_all(engine)
+        
+        with engine.begin() as conn:
+            # Same user as test_app so JWT logins keep working on the copy
+            user_id = conn.execute(users.insert().values(
+                username='testuser',
+                email='test@example.com',
+                password_hash=generate_password_hash('testpassword')
+            )).inserted_primary_key[0]
+            
+            # Create sample transactions
+            now = datetime.utcnow()
+            sample_rows = [
+                {
+                    'coin': 'BTC',
+                    'amount': 0.5,
+                    'price_usd': 45000.00,
+                    'total_value_usd': 22500.00,
+                    'transaction_type': 'buy',
+                    'transaction_date': now
+                },
+                {
+                    'coin': 'ETH',
+                    'amount': 2.0,
+                    'price_usd': 3000.00,
+                    'total_value_usd': 6000.00,
+                    'transaction_type': 'buy',
+                    'transaction_date': now
+                },
+                {
+                    'coin': 'BTC',
+                    'amount': 0.1,
+                    'price_usd': 50000.00,
+                    'total_value_usd': 5000.00,
+                    'transaction_type': 'sell',
+                    'transaction_date': now
+                }
+            ]
+            
+            transaction_ids = [
+                conn.execute(
+                    transactions.insert().values(user_id=user_id, **row)
+                ).inserted_primary_key[0]
+                for row in sample_rows
+            ]
+    finally:
+        # Release the file so it can be copied safely
+        engine.dispose()
+    
+    return template_path, transaction_ids
+
+
 @pytest.fixture
-def sample_transactions(test_app, auth_headers):
+def sample_transactions(test_app, auth_headers, sample_transactions_template):
     """
-    FIXTURE: Creates sample transactions for testing
-    - Adds multiple crypto transactions to database
+    FIXTURE: Provides sample transactions for testing
+    - Restores the session template over this test's in-memory database
+    - Writes stay isolated to this test, the template is never modified
     - Returns list of transaction IDs
     """
+    template_path, transaction_ids = sample_transactions_template
+    
     with test_app.app_context():
-        # Get test user
-        user = User.query.filter_by(username='testuser').first()
-        
-        if not user:
-            return []
-        
-        # Create sample transactions
-        transactions = [
-            Transaction(
-                user_id=user.id,
-                crypto_symbol='BTC',
-                amount=0.5,
-                price_usd=45000.00,
-                transaction_type='buy'
-            ),
-            Transaction(
-                user_id=user.id,
-                crypto_symbol='ETH',
-                amount=2.0,
-                price_usd=3000.00,
-                transaction_type='buy'
-            ),
-            Transaction(
-                user_id=user.id,
-                crypto_symbol='BTC',
-                amount=0.1,
-                price_usd=50000.00,
-                transaction_type='sell'
-            )
-        ]
-        
-        for transaction in transactions:
-            db.session.add(transaction)
-        
-        db.session.commit()
+        # End the open transaction before overwriting the database
+        db.session.remove()
         
-        return [t.id for t in transactions]
\ No newline at end of file
+        target = db.engine.raw_connection()
+        template = sqlite3.connect(template_path)
+        try:
+            template.backup(target.driver_connection)
+        finally:
+            template.close()
+            target.close()
+    
+    return list(transaction_ids)
+
+
+@pytest.fixture
+def tx_soa(test_app, sample_transactions):
+    """
+    FIXTURE: Columnar (struct-of-arrays) view of the sample transactions
+    - Loads the test user's coin, amount, price and type in a single query
+    - Returns parallel arrays so tests avoid per-row ORM attribute access
+    - symbol_ids index into the sorted 'symbols' list
+    """
+    with test_app.app_context():
+        user = User.query.filter_by(username='testuser').first()
+        rows = db.session.query(
+            Transaction.coin,
+            Transaction.amount,
+            Transaction.price_usd,
+            Transaction.transaction_type
+        ).filter_by(user_id=user.id).order_by(Transaction.id).all()
+    
+    symbols = sorted({symbol for symbol, _, _, _ in rows})
+    symbol_index = {symbol: i for i, symbol in enumerate(symbols)}
+    
+    return {
+        'symbols': symbols,
+        'symbol_ids': array('q', (symbol_index[row[0]] for row in rows)),
+        'amounts': array('d', (float(row[1]) for row in rows)),
+        'prices': array('d', (float(row[2]) for row in rows)),
+        'is_buy': array('B', (row[3] == 'buy' for row in rows)),
+    }
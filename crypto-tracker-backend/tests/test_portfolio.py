@@ -5,48 +5,45 @@ Ensures financial calculations are accurate.
 """
 
 import pytest
+from collections import defaultdict
 from datetime import datetime, timedelta
 from models import User, Transaction
 from decimal import Decimal
+from sqlalchemy import func, select
 
 
 class TestPortfolioCalculations:
     """Test portfolio value and holding calculations"""
     
-    def test_calculate_total_portfolio_value(self, test_app, sample_transactions):
+    def test_calculate_total_portfolio_value(self, tx_soa):
         """
         TEST: Portfolio should calculate total value correctly
-        - Uses sample transactions from fixture
+        - Uses columnar view of sample transactions from fixture
         - Calculates expected total value
         - Verifies portfolio calculation matches expectation
         """
-        with test_app.app_context():
-            from app import db
-            
-            user = User.query.filter_by(username='testuser').first()
-            transactions = Transaction.query.filter_by(user_id=user.id).all()
-            
-            # Calculate expected portfolio value manually
-            btc_amount = 0
-            eth_amount = 0
-            
-            for tx in transactions:
-                if tx.crypto_symbol == 'BTC':
-                    if tx.transaction_type == 'buy':
-                        btc_amount += tx.amount
-                    else:  # sell
-                        btc_amount -= tx.amount
-                elif tx.crypto_symbol == 'ETH':
-                    if tx.transaction_type == 'buy':
-                        eth_amount += tx.amount
-                    else:  # sell
-                        eth_amount -= tx.amount
-            
-            # Verify we have some holdings
-            assert btc_amount > 0 or eth_amount > 0
-            
-            # Note: In real app, you'd multiply by current prices
-            # For testing, we just verify the logic structure exists
+        # Net holdings per symbol: buys add, sells subtract
+        net_amounts = [0.0] * len(tx_soa['symbols'])
+        invested = [0.0] * len(tx_soa['symbols'])
+        
+        for symbol_id, amount, price, is_buy in zip(
+            tx_soa['symbol_ids'], tx_soa['amounts'], tx_soa['prices'], tx_soa['is_buy']
+        ):
+            sign = 1 if is_buy else -1
+            net_amounts[symbol_id] += sign * amount
+            invested[symbol_id] += sign * amount * price
+        
+        holdings = dict(zip(tx_soa['symbols'], net_amounts))
+        btc_amount = holdings.get('BTC', 0)
+        eth_amount = holdings.get('ETH', 0)
+        
+        # Verify we have some holdings
+        assert btc_amount > 0 or eth_amount > 0
+        assert abs(btc_amount - 0.4) < 1e-9
+        assert sum(invested) > 0
+        
+        # Note: In real app, you'd multiply by current prices
+        # For testing, we just verify the logic structure exists
     
     def test_calculate_holdings_by_crypto(self, test_app, sample_transactions):
         """
@@ -56,39 +53,41 @@ class TestPortfolioCalculations:
         - Verifies buy/sell transactions are handled correctly
         """
         with test_app.app_context():
-            user = User.query.filter_by(username='testuser').first()
-            transactions = Transaction.query.filter_by(user_id=user.id).all()
-            
-            # Group transactions by crypto
-            holdings = {}
+            from models import db
             
-            for tx in transactions:
-                if tx.crypto_symbol not in holdings:
-                    holdings[tx.crypto_symbol] = {
-                        'amount': 0,
-                        'total_invested': 0,
-                        'transactions': []
-                    }
-                
-                holding = holdings[tx.crypto_symbol]
+            user = User.query.filter_by(username='testuser').first()
+            transactions = db.session.query(
+                Transaction.coin,
+                Transaction.amount,
+                Transaction.price_usd,
+                Transaction.transaction_type
+            ).filter_by(user_id=user.id).all()
+            
+            # Group transactions by crypto: [amount, total_invested, count]
+            holdings = defaultdict(lambda: [0, 0, 0])
+            
+            for symbol, amount, price, ttype in transactions:
+                holding = holdings[symbol]
                 
-                if tx.transaction_type == 'buy':
-                    holding['amount'] += tx.amount
-                    holding['total_invested'] += (tx.amount * tx.price_usd)
+                if ttype == 'buy':
+                    holding[0] += amount
+                    holding[1] += (amount * price)
                 else:  # sell
-                    holding['amount'] -= tx.amount
-                    holding['total_invested'] -= (tx.amount * tx.price_usd)
+                    holding[0] -= amount
+                    holding[1] -= (amount * price)
                 
-                holding['transactions'].append(tx)
+                holding[2] += 1
             
             # Verify holdings structure
             assert len(holdings) > 0
             
-            for crypto, holding in holdings.items():
-                assert 'amount' in holding
-                assert 'total_invested' in holding
-                assert 'transactions' in holding
-                assert len(holding['transactions']) > 0
+            for crypto, (amount, total_invested, count) in holdings.items():
+                assert count > 0
+                assert amount >= 0
+                assert total_invested > 0
+            
+            # BTC: bought 0.5, sold 0.1
+            assert holdings['BTC'][0] == Decimal('0.4')
     
     def test_average_purchase_price_calculation(self, test_app):
         """
@@ -98,7 +97,7 @@ class TestPortfolioCalculations:
         - Verifies calculation accuracy
         """
         with test_app.app_context():
-            from app import db
+            from models import db
             
             user = User.query.filter_by(username='testuser').first()
             
@@ -106,17 +105,21 @@ class TestPortfolioCalculations:
             transactions = [
                 Transaction(
                     user_id=user.id,
-                    crypto_symbol='TEST',
+                    coin='TEST',
                     amount=1.0,
                     price_usd=1000.00,  # 1 * 1000 = 1000
-                    transaction_type='buy'
+                    total_value_usd=1000.00,
+                    transaction_type='buy',
+                    transaction_date=datetime.utcnow()
                 ),
                 Transaction(
                     user_id=user.id,
-                    crypto_symbol='TEST',
+                    coin='TEST',
                     amount=2.0,
                     price_usd=2000.00,  # 2 * 2000 = 4000
-                    transaction_type='buy'
+                    total_value_usd=4000.00,
+                    transaction_type='buy',
+                    transaction_date=datetime.utcnow()
                 ),
                 # Total: 3.0 coins for 5000 USD = average 1666.67 per coin
             ]
@@ -126,16 +129,20 @@ class TestPortfolioCalculations:
             db.session.commit()
             
             # Calculate average price
-            test_transactions = Transaction.query.filter_by(
+            test_transactions = db.session.query(
+                Transaction.amount,
+                Transaction.price_usd
+            ).filter_by(
                 user_id=user.id,
-                crypto_symbol='TEST',
+                coin='TEST',
                 transaction_type='buy'
             ).all()
             
-            total_amount = sum(tx.amount for tx in test_transactions)
-            total_cost = sum(tx.amount * tx.price_usd for tx in test_transactions)
+            total_amount = sum(amount for amount, price in test_transactions)
+            total_cost = sum(amount * price for amount, price in test_transactions)
             
-            expected_avg_price = total_cost / total_amount
+            # Numeric columns come back as Decimal
+            expected_avg_price = float(total_cost / total_amount)
             
             # Should be approximately 1666.67
             assert abs(expected_avg_price - 1666.67) < 0.01
@@ -148,27 +155,31 @@ class TestPortfolioCalculations:
         - Verifies calculation accuracy
         """
         with test_app.app_context():
-            from app import db
+            from models import db
             
             user = User.query.filter_by(username='testuser').first()
             
             # Buy 2 coins at $1000 each = $2000 total
             buy_tx = Transaction(
                 user_id=user.id,
-                crypto_symbol='PNL',
+                coin='PNL',
                 amount=2.0,
                 price_usd=1000.00,
-                transaction_type='buy'
+                total_value_usd=2000.00,
+                transaction_type='buy',
+                transaction_date=datetime.utcnow()
             )
             
             # Sell 1 coin at $1500 = $1500 total
             # Profit = $1500 - $1000 (cost of 1 coin) = $500
             sell_tx = Transaction(
                 user_id=user.id,
-                crypto_symbol='PNL',
+                coin='PNL',
                 amount=1.0,
                 price_usd=1500.00,
-                transaction_type='sell'
+                total_value_usd=1500.00,
+                transaction_type='sell',
+                transaction_date=datetime.utcnow()
             )
             
             db.session.add(buy_tx)
@@ -176,9 +187,13 @@ class TestPortfolioCalculations:
             db.session.commit()
             
             # Calculate P&L
-            transactions = Transaction.query.filter_by(
+            transactions = db.session.query(
+                Transaction.amount,
+                Transaction.price_usd,
+                Transaction.transaction_type
+            ).filter_by(
                 user_id=user.id,
-                crypto_symbol='PNL'
+                coin='PNL'
             ).all()
             
             total_bought = 0
@@ -186,13 +201,13 @@ class TestPortfolioCalculations:
             total_sold = 0
             total_sell_revenue = 0
             
-            for tx in transactions:
-                if tx.transaction_type == 'buy':
-                    total_bought += tx.amount
-                    total_buy_cost += (tx.amount * tx.price_usd)
+            for amount, price, ttype in transactions:
+                if ttype == 'buy':
+                    total_bought += amount
+                    total_buy_cost += (amount * price)
                 else:  # sell
-                    total_sold += tx.amount
-                    total_sell_revenue += (tx.amount * tx.price_usd)
+                    total_sold += amount
+                    total_sell_revenue += (amount * price)
             
             # Calculate average buy price
             avg_buy_price = total_buy_cost / total_bought if total_bought > 0 else 0
@@ -201,7 +216,7 @@ class TestPortfolioCalculations:
             realized_pnl = total_sell_revenue - (total_sold * avg_buy_price)
             
             # Should be $500 profit
-            assert abs(realized_pnl - 500.0) < 0.01
+            assert abs(float(realized_pnl) - 500.0) < 0.01
 
 
 class TestPortfolioPerformance:
@@ -215,57 +230,59 @@ class TestPortfolioPerformance:
         - Verifies time-based analysis
         """
         with test_app.app_context():
-            from app import db
+            from models import db
             
             user = User.query.filter_by(username='testuser').first()
             
             # Create transactions at different times
             base_time = datetime.utcnow() - timedelta(days=30)
             
-            # Transaction 30 days ago
-            old_tx = Transaction(
-                user_id=user.id,
-                crypto_symbol='TIME',
-                amount=1.0,
-                price_usd=1000.00,
-                transaction_type='buy'
-            )
-            old_tx.timestamp = base_time
-            
-            # Transaction 15 days ago
-            mid_tx = Transaction(
-                user_id=user.id,
-                crypto_symbol='TIME',
-                amount=1.0,
-                price_usd=1200.00,
-                transaction_type='buy'
-            )
-            mid_tx.timestamp = base_time + timedelta(days=15)
-            
-            # Recent transaction
-            recent_tx = Transaction(
-                user_id=user.id,
-                crypto_symbol='TIME',
-                amount=0.5,
-                price_usd=1500.00,
-                transaction_type='sell'
-            )
-            recent_tx.timestamp = base_time + timedelta(days=25)
-            
-            db.session.add(old_tx)
-            db.session.add(mid_tx)
-            db.session.add(recent_tx)
+            # One multi-row INSERT: 30 days ago, 15 days ago, 5 days ago
+            db.session.execute(Transaction.__table__.insert().values([
+                {
+                    'user_id': user.id,
+                    'coin': 'TIME',
+                    'amount': 1.0,
+                    'price_usd': 1000.00,
+                    'total_value_usd': 1000.00,
+                    'transaction_type': 'buy',
+                    'transaction_date': base_time
+                },
+                {
+                    'user_id': user.id,
+                    'coin': 'TIME',
+                    'amount': 1.0,
+                    'price_usd': 1200.00,
+                    'total_value_usd': 1200.00,
+                    'transaction_type': 'buy',
+                    'transaction_date': base_time + timedelta(days=15)
+                },
+                {
+                    'user_id': user.id,
+                    'coin': 'TIME',
+                    'amount': 0.5,
+                    'price_usd': 1500.00,
+                    'total_value_usd': 750.00,
+                    'transaction_type': 'sell',
+                    'transaction_date': base_time + timedelta(days=25)
+                }
+            ]))
             db.session.commit()
             
-            # Verify transactions have different timestamps
-            transactions = Transaction.query.filter_by(
-                user_id=user.id,
-                crypto_symbol='TIME'
-            ).order_by(Transaction.timestamp).all()
-            
-            assert len(transactions) == 3
-            assert transactions[0].timestamp < transactions[1].timestamp
-            assert transactions[1].timestamp < transactions[2].timestamp
+            # Verify transactions have different timestamps (single aggregate row)
+            count, distinct_count, earliest, latest = db.session.query(
+                func.count(),
+                func.count(func.distinct(Transaction.transaction_date)),
+                func.min(Transaction.transaction_date),
+                func.max(Transaction.transaction_date)
+            ).filter(
+                Transaction.user_id == user.id,
+                Transaction.coin == 'TIME'
+            ).one()
+            
+            assert count == 3
+            assert distinct_count == 3
+            assert earliest < latest
     
     def test_calculate_daily_portfolio_snapshots(self, test_app, sample_transactions):
         """
@@ -275,29 +292,36 @@ class TestPortfolioPerformance:
         - Verifies historical calculations
         """
         with test_app.app_context():
+            from models import db
+            
             user = User.query.filter_by(username='testuser').first()
             
             # Get all user transactions
-            transactions = Transaction.query.filter_by(user_id=user.id).order_by(Transaction.timestamp).all()
+            transactions = db.session.query(
+                Transaction.coin,
+                Transaction.amount,
+                Transaction.transaction_type,
+                Transaction.transaction_date
+            ).filter_by(user_id=user.id).order_by(Transaction.transaction_date).all()
             
             if len(transactions) > 0:
                 # Calculate portfolio at different points
-                cutoff_date = transactions[0].timestamp + timedelta(days=1)
+                cutoff_date = transactions[0].transaction_date + timedelta(days=1)
                 
                 # Transactions before cutoff
-                early_transactions = [tx for tx in transactions if tx.timestamp <= cutoff_date]
+                early_transactions = [tx for tx in transactions if tx.transaction_date <= cutoff_date]
                 
                 # Calculate holdings at that point
                 holdings_at_cutoff = {}
                 
-                for tx in early_transactions:
-                    if tx.crypto_symbol not in holdings_at_cutoff:
-                        holdings_at_cutoff[tx.crypto_symbol] = 0
+                for symbol, amount, ttype, transaction_date in early_transactions:
+                    if symbol not in holdings_at_cutoff:
+                        holdings_at_cutoff[symbol] = 0
                     
-                    if tx.transaction_type == 'buy':
-                        holdings_at_cutoff[tx.crypto_symbol] += tx.amount
+                    if ttype == 'buy':
+                        holdings_at_cutoff[symbol] += amount
                     else:
-                        holdings_at_cutoff[tx.crypto_symbol] -= tx.amount
+                        holdings_at_cutoff[symbol] -= amount
                 
                 # Verify we can calculate historical snapshots
                 for crypto, amount in holdings_at_cutoff.items():
@@ -314,25 +338,28 @@ class TestPortfolioValidation:
         - Verifies system handles it correctly
         """
         with test_app.app_context():
-            from app import db
+            from models import db
             
             user = User.query.filter_by(username='testuser').first()
             
-            zero_tx = Transaction(
+            transactions = Transaction.__table__
+            
+            db.session.execute(transactions.insert().values(
                 user_id=user.id,
-                crypto_symbol='ZERO',
+                coin='ZERO',
                 amount=0.0,
                 price_usd=1000.00,
-                transaction_type='buy'
-            )
-            
-            db.session.add(zero_tx)
+                total_value_usd=0.0,
+                transaction_type='buy',
+                transaction_date=datetime.utcnow()
+            ))
             db.session.commit()
             
-            # Should exist in database
-            saved_tx = Transaction.query.filter_by(crypto_symbol='ZERO').first()
-            assert saved_tx is not None
-            assert saved_tx.amount == 0.0
+            # Should exist in database (scalar_one fails if missing)
+            saved_amount = db.session.execute(
+                select(transactions.c.amount).where(transactions.c.coin == 'ZERO')
+            ).scalar_one()
+            assert saved_amount == 0.0
     
     def test_handle_negative_prices(self, test_app):
         """
@@ -341,27 +368,30 @@ class TestPortfolioValidation:
         - System should either reject or handle appropriately
         """
         with test_app.app_context():
-            from app import db
+            from models import db
             
             user = User.query.filter_by(username='testuser').first()
             
-            negative_price_tx = Transaction(
-                user_id=user.id,
-                crypto_symbol='NEG',
-                amount=1.0,
-                price_usd=-1000.00,  # Negative price
-                transaction_type='buy'
-            )
-            
-            db.session.add(negative_price_tx)
+            transactions = Transaction.__table__
             
             # This might raise an exception or be allowed
             # The test documents the current behavior
             try:
+                db.session.execute(transactions.insert().values(
+                    user_id=user.id,
+                    coin='NEG',
+                    amount=1.0,
+                    price_usd=-1000.00,  # Negative price
+                    total_value_usd=-1000.00,
+                    transaction_type='buy',
+                    transaction_date=datetime.utcnow()
+                ))
                 db.session.commit()
                 # If it succeeds, document that negative prices are allowed
-                saved_tx = Transaction.query.filter_by(crypto_symbol='NEG').first()
-                assert saved_tx.price_usd == -1000.00
+                saved_price = db.session.execute(
+                    select(transactions.c.price_usd).where(transactions.c.coin == 'NEG')
+                ).scalar_one()
+                assert saved_price == -1000.00
             except Exception:
                 # If it fails, that's also valid behavior
                 db.session.rollback()